@@ -1,3 +1,3 @@
-from .automator import Automator
+from .automator import Automator, AsyncAutomator
 
-__all__ = ["Automator"]
+__all__ = ["Automator", "AsyncAutomator"]
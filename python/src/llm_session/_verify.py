@@ -1,11 +1,5 @@
-import os
-import sys
-from pathlib import Path
-
-# Add src to path so we can import without installing
-sys.path.append(str(Path(__file__).parent / "src"))
-
-from llm_session import Automator
+from .automator import Automator
+from .config import Config
 
 def main():
     print("--- Starting Verification ---")
@@ -19,12 +13,10 @@ def main():
         print("Initializing Automator...")
         bot = Automator(
             headless=False,
-            provider="chatgpt", 
-            credentials={
-                "email": "email@example.com", 
-                "password": "password",
-                "method": "google"
-            }
+            provider="chatgpt",
+            # Read from CHATGPT_EMAIL / CHATGPT_PASSWORD / CHATGPT_GOOGLE_LOGIN; this module
+            # ships in the package, so credentials must never be written into it
+            credentials=dict(Config.get_credentials("chatgpt"))
         )
 
         # Test 2: Chained Prompt
@@ -1,16 +1,133 @@
-from typing import List, Optional, Callable, Union
+from typing import AsyncIterator, Iterator, List, NamedTuple, Optional, Callable, Set, Tuple, Union
+from enum import Enum
+import asyncio
 import logging
-from .browser import BrowserManager
+import re
+import threading
+import weakref
 from .config import Config
-from .providers.chatgpt import ChatGPTProvider
 from .exceptions import SetupError, OTPRequiredError
 
 logger = logging.getLogger(__name__)
 
-class Automator:
+PromptItem = Union[str, Callable[[str], str]]
+
+# Placeholders for the previous response, found in a single pass over the prompt
+_TOKEN_RE = re.compile(r"\{\{previous\}\}|\{\{\}\}|\{\}")
+# Prompts str.format can safely fill: exactly one {} placeholder, any other braces escaped
+_FORMAT_RE = re.compile(r"(?:[^{}]|\{\{|\}\})*\{\}(?:[^{}]|\{\{|\}\})*")
+
+
+class _PromptKind(Enum):
+    """How a chain item turns the previous response into a prompt."""
+    LITERAL = "literal"
+    PREVIOUS_TOKEN = "previous_token"
+    LEGACY_DOUBLE = "legacy_double"
+    FORMAT = "format"
+    CALLABLE = "callable"
+
+
+class _CompiledPrompt(NamedTuple):
+    kind: _PromptKind
+    render: Callable[[str], str]
+
+    @property
+    def dependent(self) -> bool:
+        """Whether the prompt can only be built once the previous response is known."""
+        return self.kind is not _PromptKind.LITERAL
+
+
+def _splice(text: str, token: str) -> Callable[[str], str]:
+    """Split text on token once, so substitution is a join instead of a str.replace scan."""
+    parts = text.split(token)
+    if len(parts) == 2:
+        prefix, suffix = parts
+        return lambda previous: "".join((prefix, previous, suffix))
+    return lambda previous: previous.join(parts)
+
+
+def _compile_prompt(prompt_item: PromptItem) -> _CompiledPrompt:
+    """Classify a chain item once and bind the substitution it needs."""
+    if callable(prompt_item):
+        return _CompiledPrompt(_PromptKind.CALLABLE, prompt_item)
+    if not isinstance(prompt_item, str):
+        return _CompiledPrompt(_PromptKind.LITERAL, lambda _previous: "")
+
+    # We use a specific placeholder {{previous}} to avoid accidental formatting of user code
+    # But we also support {} for backward compatibility if it's simple
+    tokens = set(_TOKEN_RE.findall(prompt_item))
+    if "{{previous}}" in tokens:
+        return _CompiledPrompt(_PromptKind.PREVIOUS_TOKEN, _splice(prompt_item, "{{previous}}"))
+    if tokens and _FORMAT_RE.fullmatch(prompt_item):
+        return _CompiledPrompt(_PromptKind.FORMAT, prompt_item.format)
+    if "{{}}" in tokens: # Support legacy double braces
+        return _CompiledPrompt(_PromptKind.LEGACY_DOUBLE, _splice(prompt_item, "{{}}"))
+    # Plain text, or braces that aren't a single {} placeholder (e.g. JSON snippets): send as-is
+    return _CompiledPrompt(_PromptKind.LITERAL, lambda _previous, text=prompt_item: text)
+
+
+def _needs_templating(prompt_item: PromptItem) -> bool:
+    """Cheap check for anything other than a plain string without placeholders."""
+    return not isinstance(prompt_item, str) or _TOKEN_RE.search(prompt_item) is not None
+
+
+def _compile_prompts(prompts: List[PromptItem]) -> List[_CompiledPrompt]:
+    """Compile every chain item up front so the chain loop does no string scanning."""
+    return [_compile_prompt(prompt_item) for prompt_item in prompts]
+
+
+async def _shutdown(browser_manager, in_executor: bool = True) -> None:
+    """Persist an authenticated session, then stop the browser manager."""
+    # A fresh context doesn't write back refreshed or rotated cookies on its own
+    if browser_manager.authenticated and browser_manager.context:
+        try:
+            await browser_manager.save_session(browser_manager.session_path, in_executor=in_executor)
+        except Exception as e:
+            logger.warning("Failed to save session: %s", e)
+    await browser_manager.stop()
+
+
+# Shutdowns scheduled by finalizers; the loop only keeps weak references to its tasks
+_background_tasks: Set[asyncio.Task] = set()
+
+def _spawn_shutdown(browser_manager) -> None:
+    task = asyncio.get_running_loop().create_task(_shutdown(browser_manager, in_executor=False))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+def _release_browser(browser_manager) -> None:
     """
-    Main entry point for the LLM Web Automator.
+    Stop a browser manager whose automator was never closed, on the loop it was started on.
+    This may run at interpreter exit, when the default executor no longer accepts work,
+    so the session is written on the loop thread.
     """
+    loop = browser_manager.loop
+    if loop is None or loop.is_closed():
+        return
+    if loop.is_running():
+        loop.call_soon_threadsafe(_spawn_shutdown, browser_manager)
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        loop.run_until_complete(_shutdown(browser_manager, in_executor=False))
+    # Otherwise another loop is running in this thread; the browser goes away with the process
+
+
+class AsyncAutomator:
+    """
+    Asynchronous entry point for the LLM Web Automator.
+
+    Use ``await AsyncAutomator.create(...)`` to get a ready-to-use instance.
+    Several automators can share one event loop, so browser startup and
+    prompt round-trips of independent sessions overlap.
+    """
+
+    __slots__ = (
+        "provider_name", "headless", "credentials", "session_path", "config", "on_otp_required",
+        "browser_manager", "provider", "max_parallel",
+        "_prompt_lock", "_parallel_slots", "_pending_saves", "_finalizer", "__weakref__",
+    )
 
     def __init__(self, provider: str = "chatgpt", headless: bool = True, credentials: Optional[dict] = None, session_path: Optional[str] = None, config: Optional[dict] = None, on_otp_required: Optional[Callable[[], str]] = None):
         self.provider_name = provider
@@ -19,97 +136,279 @@ class Automator:
         self.session_path = session_path
         self.config = config or {}
         self.on_otp_required = on_otp_required
+        from .browser import BrowserManager
         self.browser_manager = BrowserManager()
         self.provider = None
-        
-        # Initialize
-        self._setup()
+        # A provider drives a single page, so prompts on it must not interleave
+        self._prompt_lock = asyncio.Lock()
+        # Independent prompts may be spread over up to max_parallel pages (the main one included)
+        self.max_parallel = max(int(self.config.get("max_parallel", 1)), 1)
+        self._parallel_slots = asyncio.Semaphore(max(self.max_parallel - 1, 1))
+        self._pending_saves: List[asyncio.Task] = []
+        # Releases the browser if the automator is garbage collected without close()
+        self._finalizer = weakref.finalize(self, _release_browser, self.browser_manager)
 
-    def _setup(self):
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "AsyncAutomator":
+        """Construct an automator and initialize its browser and provider."""
+        automator = cls(*args, **kwargs)
+        try:
+            await automator._setup()
+        except BaseException:
+            await automator.close()
+            raise
+        return automator
+
+    async def _setup(self):
         """Initialize browser and provider."""
-        # 1. Start Browser
-        # Pass session_path if available to load cookies
-        page = self.browser_manager.start(headless=self.headless, session_path=self.session_path)
-        
-        # Grant clipboard permissions for response extraction
-        self.browser_manager.context.grant_permissions(["clipboard-read", "clipboard-write"])
-        
-        # 2. Initialize Provider
-        if self.provider_name.lower() == "chatgpt":
-            # Pass config for selectors if needed
-            self.provider = ChatGPTProvider(page, config=self.config, on_otp_required=self.on_otp_required)
-        else:
+        # 1. Resolve Provider
+        # Providers pull in Playwright, so the registry is only imported once it's needed
+        from .providers import PROVIDERS
+        provider_cls = PROVIDERS.get(self.provider_name.lower())
+        if provider_cls is None:
             raise NotImplementedError(f"Provider {self.provider_name} not supported.")
-            
+
+        # 2. Start Browser
+        # The saved session and the provider's permissions are applied when the context is created
+        page = await self.browser_manager.start(headless=self.headless, session_path=self.session_path, permissions=provider_cls.PERMISSIONS)
+
+        # Pass config for selectors if needed
+        self.provider = provider_cls(page, config=self.config, on_otp_required=self.on_otp_required)
+
         # 3. Check Auth / Auto-Login
-        if not self.browser_manager.is_authenticated(self.provider.URL, self.provider.SEL_PROFILE_BTN):
+        if not await self.browser_manager.is_authenticated(self.provider.URL, self.provider.SEL_PROFILE_BTN, session_cookie=self.provider.SESSION_COOKIE, login_selector=self.provider.SEL_LOGIN_BTN):
             logger.info("Not authenticated. Initiating login...")
-            
+
             # Prioritize passed credentials, fallback to Config/Env vars
             creds = self.credentials or Config.get_credentials(self.provider_name)
-            
+
             if not creds.get("email") or not creds.get("password"):
                 raise SetupError("Credentials not found. Pass them to Automator() or set environment variables (CHATGPT_EMAIL, CHATGPT_PASSWORD).")
-            
-            self.provider.login(creds)
-            
-            # Save session if path provided
-            if self.session_path:
-                self.browser_manager.save_session(self.session_path)
-                logger.info(f"Session saved to {self.session_path}")
+
+            await self.provider.login(creds)
+            self.browser_manager.authenticated = True
+
+            # Save session to the provided path, or the default state file.
+            # The write runs in the background; close() waits for it.
+            self._pending_saves.append(asyncio.create_task(self._save_session()))
         else:
+            self.browser_manager.authenticated = True
             logger.info("Session authenticated.")
 
-    def process_prompt(self, prompt: str) -> str:
+    async def process_prompt(self, prompt: str) -> str:
         """
         Send a single prompt and get the response.
         """
         if not self.provider:
             raise SetupError("Provider not initialized.")
-        return self.provider.send_prompt(prompt)
+        async with self._prompt_lock:
+            return await self.provider.send_prompt(prompt)
 
-    def process_chain(self, prompts: List[Union[str, Callable[[str], str]]]) -> List[str]:
+    async def process_chain(self, prompts: List[PromptItem]) -> List[str]:
         """
-        Process a chain of prompts. 
+        Process a chain of prompts.
         Supports string formatting with {} (previous response injected) or callables.
+
+        Consecutive prompts that don't reference the previous response are
+        dispatched together; dependent prompts wait for the one before them.
         """
-        responses = []
+        responses: List[Optional[str]] = [None] * len(prompts)
+        async for index, response in self.stream_chain(prompts):
+            responses[index] = response
+        return responses
+
+    async def stream_chain(self, prompts: List[PromptItem]) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Process a chain of prompts, yielding (index, response) pairs as responses arrive.
+        Within a run of independent prompts, responses may arrive out of order.
+        To stop early, ``await aclose()`` the generator so in-flight prompts are cancelled right away.
+        """
+        if not any(map(_needs_templating, prompts)):
+            # Common case: nothing to substitute, so the whole chain is one independent run
+            logger.info("Processing %d prompts...", len(prompts))
+            # Close the inner stream as soon as we stop, so its shards release the page and lock
+            run_stream = self._stream_independent(prompts)
+            try:
+                async for pair in run_stream:
+                    yield pair
+            finally:
+                await run_stream.aclose()
+            return
+
+        compiled = _compile_prompts(prompts)
+        total = len(compiled)
         last_response = ""
-        
-        for i, prompt_item in enumerate(prompts):
-            current_prompt = ""
-            
-            if callable(prompt_item):
-                current_prompt = prompt_item(last_response)
-            elif isinstance(prompt_item, str):
-                # If it's a string, try to format it with the last response if it contains placeholders
-                # We use a specific placeholder {{previous}} to avoid accidental formatting of user code
-                # But we also support {} for backward compatibility if it's simple
-                
-                if "{{previous}}" in prompt_item:
-                     current_prompt = prompt_item.replace("{{previous}}", last_response)
-                elif "{}" in prompt_item:
-                    # Basic check to avoid formatting JSON or Python dicts
-                    # If the string looks like code, we might skip this or warn?
-                    # For now, we'll just try format, but this is risky as noted in review.
-                    # Better approach: Only format if it's clearly a placeholder.
+
+        i = 0
+        while i < total:
+            if compiled[i].dependent:
+                current_prompt = compiled[i].render(last_response)
+                logger.info("Processing prompt %d/%d...", i + 1, total)
+                last_response = await self.process_prompt(current_prompt)
+                yield i, last_response
+                i += 1
+                continue
+
+            # Maximal run of independent prompts starting at i
+            end = i + 1
+            while end < total and not compiled[end].dependent:
+                end += 1
+
+            logger.info("Processing prompts %d-%d/%d...", i + 1, end, total)
+            run = [compiled[k].render(last_response) for k in range(i, end)]
+            run_stream = self._stream_independent(run)
+            try:
+                async for k, response in run_stream:
+                    if k == len(run) - 1:
+                        last_response = response
+                    yield i + k, response
+            finally:
+                await run_stream.aclose()
+            i = end
+
+    async def _stream_independent(self, prompts: List[str]) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Process prompts that don't depend on each other, yielding (index, response) as they complete.
+        With max_parallel > 1 they are sharded round-robin over the main page and extra
+        browser contexts sharing this session, so wall-clock time is the slowest shard.
+        """
+        if not prompts:
+            return
+        if not self.provider:
+            raise SetupError("Provider not initialized.")
+
+        shards = min(len(prompts), self.max_parallel)
+        storage_state = await self.browser_manager.context.storage_state() if shards > 1 else None
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def send_all(provider, indices: range):
+            for k in indices:
+                await results.put((k, await provider.send_prompt(prompts[k])))
+
+        async def run_shard(shard: int):
+            indices = range(shard, len(prompts), shards)
+            try:
+                if shard == 0:
+                    async with self._prompt_lock:
+                        await send_all(self.provider, indices)
+                    return
+
+                async with self._parallel_slots:
+                    context, page = await self.browser_manager.open_context(storage_state)
                     try:
-                        current_prompt = prompt_item.format(last_response)
-                    except ValueError:
-                        # If format fails (e.g. mismatched braces), treat as literal
-                        current_prompt = prompt_item
-                elif "{{}}" in prompt_item: # Support legacy double braces
-                    current_prompt = prompt_item.replace("{{}}", last_response)
-                else:
-                    current_prompt = prompt_item
-            
-            logger.info(f"Processing prompt {i+1}/{len(prompts)}...")
-            response = self.process_prompt(current_prompt)
-            responses.append(response)
-            last_response = response
-            
-        return responses
+                        provider = type(self.provider)(page, config=self.config, on_otp_required=self.on_otp_required)
+                        await page.goto(provider.URL, wait_until="domcontentloaded")
+                        await send_all(provider, indices)
+                    finally:
+                        await context.close()
+            except Exception as e:
+                # Hand the failure to the consumer instead of leaving it waiting
+                await results.put((None, e))
+
+        tasks = [asyncio.create_task(run_shard(shard)) for shard in range(shards)]
+        try:
+            for _ in range(len(prompts)):
+                k, response = await results.get()
+                if k is None:
+                    raise response
+                yield k, response
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _save_session(self):
+        await self.browser_manager.save_session(self.session_path)
+        logger.info("Session saved to %s", self.session_path or self.browser_manager.state_path)
+
+    async def close(self):
+        """Clean up resources."""
+        self._finalizer.detach()
+        if self._pending_saves:
+            results = await asyncio.gather(*self._pending_saves, return_exceptions=True)
+            self._pending_saves.clear()
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning("Failed to save session: %s", result)
+        await _shutdown(self.browser_manager)
+
+
+# Playwright objects are bound to the loop they were created on, so each thread keeps
+# one long-lived loop for its synchronous automators (asyncio.run would close it).
+_sync_state = threading.local()
+
+def _thread_loop() -> asyncio.AbstractEventLoop:
+    """Event loop shared by the synchronous automators of the current thread."""
+    loop = getattr(_sync_state, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _sync_state.loop = asyncio.new_event_loop()
+    return loop
+
+def _run_sync(coro, loop: asyncio.AbstractEventLoop):
+    """Run a coroutine to completion on a synchronous automator's loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise SetupError("Automator cannot be used inside a running event loop. Use AsyncAutomator instead.")
+    if loop.is_running():
+        coro.close()
+        raise SetupError("Automator is already in use by another thread. Create one Automator per thread.")
+    return loop.run_until_complete(coro)
+
+
+class Automator:
+    """
+    Main entry point for the LLM Web Automator.
+
+    Blocking wrapper around AsyncAutomator.
+    """
+
+    __slots__ = ("_automator", "_loop")
+
+    def __init__(self, provider: str = "chatgpt", headless: bool = True, credentials: Optional[dict] = None, session_path: Optional[str] = None, config: Optional[dict] = None, on_otp_required: Optional[Callable[[], str]] = None):
+        self._loop = _thread_loop()
+        self._automator = self._run(AsyncAutomator.create(
+            provider=provider,
+            headless=headless,
+            credentials=credentials,
+            session_path=session_path,
+            config=config,
+            on_otp_required=on_otp_required,
+        ))
+
+    def _run(self, coro):
+        return _run_sync(coro, self._loop)
+
+    def process_prompt(self, prompt: str) -> str:
+        """
+        Send a single prompt and get the response.
+        """
+        return self._run(self._automator.process_prompt(prompt))
+
+    def process_chain(self, prompts: List[PromptItem]) -> List[str]:
+        """
+        Process a chain of prompts.
+        Supports string formatting with {} (previous response injected) or callables.
+        """
+        return self._run(self._automator.process_chain(prompts))
+
+    def stream_chain(self, prompts: List[PromptItem]) -> Iterator[Tuple[int, str]]:
+        """
+        Process a chain of prompts, yielding (index, response) pairs as responses arrive.
+        """
+        stream = self._automator.stream_chain(prompts)
+        try:
+            while True:
+                try:
+                    yield self._run(stream.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._run(stream.aclose())
 
     def close(self):
         """Clean up resources."""
-        self.browser_manager.stop()
+        self._run(self._automator.close())
@@ -1,19 +1,198 @@
+import asyncio
+import json
+import logging
 import os
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
-from typing import Optional
-from playwright.sync_api import sync_playwright, BrowserContext, Page, Playwright
+from typing import Dict, List, Optional, Tuple, Union
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
 import appdirs
 
 from .exceptions import SetupError
 
+logger = logging.getLogger(__name__)
+
+def _write_json(path: Path, data: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write a sibling temp file and swap it in, so concurrent saves or an interrupt never leave a torn file
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(data).encode())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _read_json(path: Path) -> Optional[dict]:
+    """Read a saved session state, or None if there is none or it can't be used."""
+    try:
+        with open(path, "rb") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable session state %s: %s", path, e)
+        return None
+
+async def wait_for_first(page: Page, selectors: List[str], timeout: float) -> Optional[int]:
+    """
+    Wait until any of the selectors is visible, without polling.
+
+    Args:
+        page: Page to watch.
+        selectors: Candidate selectors.
+        timeout: Maximum time to wait, in milliseconds.
+
+    Returns:
+        Optional[int]: Index of the first selector to appear, or None if none did in time.
+    """
+    waiters = [asyncio.create_task(page.wait_for_selector(selector, timeout=timeout)) for selector in selectors]
+    pending = set(waiters)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # A waiter that failed (e.g. timed out) doesn't decide the race; keep waiting on the others
+            for index, waiter in enumerate(waiters):
+                if waiter in done and waiter.exception() is None:
+                    return index
+        return None
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+        # Reap every waiter, so failures that lost the race aren't reported as never retrieved
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+class _PooledBrowser:
+    """A Playwright driver and Chromium process shared within one event loop."""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.playwright: Optional[Playwright] = None
+        self.browser: Optional[Browser] = None
+        self.refcount = 0
+
+    async def launch(self, headless: bool):
+        try:
+            self.playwright = await async_playwright().start()
+        except Exception as e:
+             raise SetupError(f"Failed to start Playwright. Make sure it is installed: {e}")
+
+        try:
+            self.browser = await self.playwright.chromium.launch(
+                headless=headless,
+                args=[
+                    "--disable-blink-features=AutomationControlled",
+                    "--no-sandbox",
+                    "--disable-infobars",
+                    "--exclude-switches=enable-automation",
+                    "--disable-background-timer-throttling",
+                    "--disable-backgrounding-occluded-windows",
+                    "--disable-renderer-backgrounding"
+                ]
+            )
+        except Exception as e:
+            await self.playwright.stop()
+            self.playwright = None
+            raise SetupError(f"Failed to launch browser. You may need to run 'playwright install': {e}")
+
+    async def close(self):
+        browser, playwright = self.browser, self.playwright
+        self.browser = self.playwright = None
+        if browser:
+            await browser.close()
+        if playwright:
+            await playwright.stop()
+
+
+class BrowserPool:
+    """
+    Shares a Playwright driver and Chromium process between BrowserManagers.
+
+    Playwright objects are bound to the event loop that created them, so there is
+    one pooled browser per loop (and so per thread running blocking automators)
+    and headless mode.
+    The browser is launched by the first acquire() and torn down when the last
+    holder calls release(); every holder gets its own BrowserContext.
+    """
+
+    _entries: Dict[Tuple[asyncio.AbstractEventLoop, bool], _PooledBrowser] = {}
+
+    @classmethod
+    async def acquire(cls, headless: bool = True, storage_state: Optional[Union[str, dict]] = None, permissions: Optional[List[str]] = None) -> Tuple[Browser, BrowserContext, Page]:
+        """
+        Get a fresh context and page on the shared browser, launching it if needed.
+
+        Args:
+            headless: Whether the browser runs in headless mode.
+            storage_state: Session state to load, or the path to a storageState.json file.
+            permissions: Permissions to grant to the new context.
+
+        Returns:
+            Tuple[Browser, BrowserContext, Page]: The shared browser, a new context and its page.
+        """
+        key = (asyncio.get_running_loop(), headless)
+        while True:
+            entry = cls._entries.setdefault(key, _PooledBrowser())
+            async with entry.lock:
+                if cls._entries.get(key) is not entry:
+                    # Torn down by release() while we waited for the lock
+                    continue
+                if entry.browser is None:
+                    try:
+                        await entry.launch(headless)
+                    except Exception:
+                        del cls._entries[key]
+                        raise
+                entry.refcount += 1
+                browser = entry.browser
+            break
+
+        try:
+            context = await browser.new_context(
+                storage_state=storage_state,
+                permissions=permissions
+            )
+            page = await context.new_page()
+        except Exception as e:
+            await cls.release(headless)
+            raise SetupError(f"Failed to open a browser context: {e}")
+
+        return browser, context, page
+
+    @classmethod
+    async def release(cls, headless: bool = True):
+        """Drop one reference to the shared browser, closing it when none are left."""
+        key = (asyncio.get_running_loop(), headless)
+        entry = cls._entries.get(key)
+        if entry is None:
+            return
+        async with entry.lock:
+            entry.refcount -= 1
+            if entry.refcount > 0:
+                return
+            del cls._entries[key]
+            await entry.close()
+
+
 class BrowserManager:
-    """Manages the Playwright browser instance and persistent context."""
+    """Manages a browser context on the shared browser and its persisted session state."""
+
+    STATE_FILE = "storage_state.json"
 
     def __init__(self, app_name: str = "LLMSession"):
         self.user_data_dir = Path(appdirs.user_data_dir(app_name, appauthor=False))
-        self.playwright: Optional[Playwright] = None
+        self.state_path = self.user_data_dir / self.STATE_FILE
+        self.permissions: Optional[List[str]] = None
+        self.session_path: Optional[str] = None
+        # Set once the context holds a logged-in session worth persisting
+        self.authenticated = False
+        self.headless = True
+        # Event loop the context was opened on; Playwright objects are bound to it
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
 
@@ -26,108 +205,125 @@ class BrowserManager:
         # If launch fails, we assume it's missing and tell the user what to do.
         pass
 
-    def start(self, headless: bool = True, session_path: Optional[str] = None) -> Page:
+    async def start(self, headless: bool = True, session_path: Optional[str] = None, permissions: Optional[List[str]] = None) -> Page:
         """
-        Start the browser with a persistent context.
-        
+        Open a context on the shared browser, restoring the saved session.
+
         Args:
             headless: Whether to run in headless mode.
             session_path: Path to a storageState.json file to load cookies/session.
-            
+                Defaults to the state file in the user data directory.
+            permissions: Permissions to grant to the context (e.g. clipboard access).
+
         Returns:
-            Page: The default page of the context.
+            Page: The page of the new context.
         """
         if not self.user_data_dir.exists():
             self.user_data_dir.mkdir(parents=True, exist_ok=True)
 
-        try:
-            self.playwright = sync_playwright().start()
-        except Exception as e:
-             raise SetupError(f"Failed to start Playwright. Make sure it is installed: {e}")
-        
-        # Launch persistent context
-        user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
-        
-        try:
-            self.context = self.playwright.chromium.launch_persistent_context(
-                user_data_dir=str(self.user_data_dir),
-                headless=headless,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--no-sandbox",
-                    "--disable-infobars",
-                    "--exclude-switches=enable-automation",
-                    "--disable-background-timer-throttling",
-                    "--disable-backgrounding-occluded-windows",
-                    "--disable-renderer-backgrounding"
-                ]
-            )
-        except Exception as e:
-            raise SetupError(f"Failed to launch browser. You may need to run 'playwright install': {e}")
-        
-        # Load session if provided (though persistent context usually handles this, 
-        # explicit loading can be useful if we want to inject a specific state file into the persistent dir)
-        # Note: launch_persistent_context uses the user_data_dir, so it persists automatically.
-        # If session_path is provided, we might want to overwrite or merge?
-        # Playwright doesn't have a direct 'load_storage_state' for persistent context after launch easily
-        # without just relying on the dir. 
-        # However, if the user wants to *import* a session, we can try to deserialize and add cookies.
-        # For now, we'll rely on the persistent context behavior, but if a path is given, we assume
-        # the user wants to use THAT state. 
-        # Actually, launch_persistent_context doesn't take 'storageState' arg like launch().
-        # So we rely on user_data_dir. 
-        # If session_path is passed, we can manually add cookies.
-        
-        if len(self.context.pages) > 0:
-            self.page = self.context.pages[0]
-        else:
-            self.page = self.context.new_page()
-            
+        state_path = Path(session_path) if session_path else self.state_path
+        # A missing or corrupt state file means "not logged in"; the login flow replaces it
+        storage_state = await asyncio.get_running_loop().run_in_executor(None, _read_json, state_path)
+
+        self.permissions = permissions
+        self.session_path = session_path
+        self.headless = headless
+        self.loop = asyncio.get_running_loop()
+        self.browser, self.context, self.page = await BrowserPool.acquire(headless=headless, storage_state=storage_state, permissions=permissions)
         return self.page
 
-    def save_session(self, path: str):
-        """Save the current session (cookies/storage) to a file."""
-        if self.context:
-            self.context.storage_state(path=path)
+    async def open_context(self, storage_state: Optional[dict] = None) -> Tuple[BrowserContext, Page]:
+        """
+        Open an additional context on the shared browser, e.g. to run prompts in parallel.
+        The caller owns the context and must close it.
+
+        Args:
+            storage_state: Session state to load, as returned by BrowserContext.storage_state().
+
+        Returns:
+            Tuple[BrowserContext, Page]: The new context and its page.
+        """
+        if not self.browser:
+            raise SetupError("Browser not started.")
+        context = await self.browser.new_context(storage_state=storage_state, permissions=self.permissions)
+        try:
+            return context, await context.new_page()
+        except Exception:
+            await context.close()
+            raise
+
+    async def save_session(self, path: Optional[str] = None, in_executor: bool = True):
+        """
+        Save the current session (cookies/storage) to a file, by default in the user data directory.
+
+        Args:
+            path: File to write the storageState.json to.
+            in_executor: Serialize and write off the event loop. Pass False when the
+                executor may be unavailable, e.g. from a finalizer at interpreter exit.
+        """
+        if not self.context:
+            return
+        storage_state = await self.context.storage_state()
+        state_path = Path(path) if path else self.state_path
+        if not in_executor:
+            _write_json(state_path, storage_state)
+            return
+        # The state can be several MB
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _write_json, state_path, storage_state)
 
     def load_session(self, path: str):
         """
-        Load a session from a file. 
-        Note: For persistent context, this is best done by just using the same user_data_dir.
-        But we can manually add cookies if needed.
+        Load a session from a file.
+        Note: Sessions are loaded when the context is created; pass session_path to start() instead.
         """
-        # Not fully implemented for persistent context as it handles its own state.
         pass
 
-    def stop(self):
-        """Close the browser context and playwright."""
-        if self.context:
-            self.context.close()
-        if self.playwright:
-            self.playwright.stop()
+    async def stop(self):
+        """Close the browser context and release the shared browser."""
+        if not self.browser:
+            return
+        context, self.browser, self.context, self.page = self.context, None, None, None
+        try:
+            await context.close()
+        finally:
+            await BrowserPool.release(self.headless)
 
-    def is_authenticated(self, check_url: str, check_selector: str) -> bool:
+    async def is_authenticated(self, check_url: str, check_selector: str, session_cookie: Optional[str] = None, login_selector: Optional[str] = None) -> bool:
         """
         Check if the session is authenticated by navigating to a URL and checking for an element.
         
         Args:
             check_url: URL to visit.
             check_selector: Selector that indicates a logged-in state.
+            session_cookie: Name (or name prefix) of the provider's session cookie. If the
+                context holds no such cookie, the session is reported as unauthenticated
+                without navigating.
+            login_selector: Selector that indicates a logged-out state. If given, the check
+                resolves as soon as either selector appears instead of waiting out the timeout.
             
         Returns:
             bool: True if authenticated.
         """
         if not self.page:
             raise SetupError("Browser not started.")
+
+        if session_cookie:
+            cookies = await self.context.cookies(check_url)
+            if not any(cookie["name"].startswith(session_cookie) for cookie in cookies):
+                return False
         
         try:
-            self.page.goto(check_url, wait_until="domcontentloaded")
+            await self.page.goto(check_url, wait_until="domcontentloaded")
+            if login_selector:
+                return await wait_for_first(self.page, [check_selector, login_selector], timeout=5000) == 0
             # Wait a bit for dynamic content, but not too long
             try:
-                self.page.wait_for_selector(check_selector, timeout=5000)
+                await self.page.wait_for_selector(check_selector, timeout=5000)
                 return True
             except:
                 return False
         except Exception as e:
             print(f"Auth check failed: {e}")
             return False
+
@@ -1,30 +1,49 @@
 import os
-from typing import Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+def _parse_bool(value: Optional[str]) -> bool:
+    return (value or "").lower() == "true"
+
+# Credential fields per provider: (key, environment variable[, parser])
+_PROVIDERS = {
+    "chatgpt": (
+        ("email", "CHATGPT_EMAIL"),
+        ("password", "CHATGPT_PASSWORD"),
+        ("google_login", "CHATGPT_GOOGLE_LOGIN", _parse_bool),
+    ),
+}
+
+# For the MVP, we want it to be non-interactive, so headless=True by default unless specified.
+_HEADLESS_DEFAULT = _parse_bool(os.environ.get("LLM_AUTOMATOR_HEADLESS", "true"))
+
+@lru_cache(maxsize=8)
+def _load_credentials(provider: str) -> Mapping[str, object]:
+    credentials = {}
+    for key, env_var, *parser in _PROVIDERS.get(provider, ()):
+        value = os.environ.get(env_var)
+        credentials[key] = parser[0](value) if parser else value
+    return MappingProxyType(credentials)
 
 class Config:
     """Configuration handler for LLM Automator."""
-    
+
     @staticmethod
-    def get_credentials(provider: str) -> dict:
+    def get_credentials(provider: str) -> Mapping[str, object]:
         """
         Retrieve credentials for a specific provider from environment variables.
-        
+        The environment is read once per provider and cached for the process lifetime.
+
         Args:
             provider: The name of the provider (e.g., 'chatgpt').
-            
+
         Returns:
-            dict: A dictionary containing credentials.
+            Mapping: A read-only mapping containing credentials.
         """
-        if provider.lower() == "chatgpt":
-            return {
-                "email": os.environ.get("CHATGPT_EMAIL"),
-                "password": os.environ.get("CHATGPT_PASSWORD"),
-                "google_login": os.environ.get("CHATGPT_GOOGLE_LOGIN", "false").lower() == "true"
-            }
-        return {}
+        return _load_credentials(provider.lower())
 
     @staticmethod
     def get_headless_mode() -> bool:
         """Check if headless mode is enabled (default: False for debug, True for prod usually, but MVP says non-interactive)."""
-        # For the MVP, we want it to be non-interactive, so headless=True by default unless specified.
-        return os.environ.get("LLM_AUTOMATOR_HEADLESS", "true").lower() == "true"
+        return _HEADLESS_DEFAULT
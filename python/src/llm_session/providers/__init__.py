@@ -0,0 +1,17 @@
+from typing import Callable, Dict, Type
+from .base import LLMProvider
+
+# Provider classes by lower-case name, filled in by @register as provider modules are imported
+PROVIDERS: Dict[str, Type[LLMProvider]] = {}
+
+def register(name: str) -> Callable[[Type[LLMProvider]], Type[LLMProvider]]:
+    """Class decorator that makes a provider available to Automator under the given name."""
+    def decorator(cls: Type[LLMProvider]) -> Type[LLMProvider]:
+        PROVIDERS[name.lower()] = cls
+        return cls
+    return decorator
+
+# Imported after register() is defined; the module registers its provider on import
+from .chatgpt import ChatGPTProvider
+
+__all__ = ["LLMProvider", "PROVIDERS", "register", "ChatGPTProvider"]
@@ -1,14 +1,28 @@
 from abc import ABC, abstractmethod
-from playwright.sync_api import Page
+from typing import Callable, List, Optional
+from playwright.async_api import Page
 
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
 
-    def __init__(self, page: Page):
+    # Browser permissions granted to the provider's context
+    PERMISSIONS: List[str] = []
+    # Name (or name prefix) of the cookie that holds a logged-in session, if known
+    SESSION_COOKIE: Optional[str] = None
+
+    # Page opened to check for an existing session, and the element that only shows when logged in
+    URL: str
+    SEL_PROFILE_BTN: str
+    # Element that only shows when logged out, if the provider has one
+    SEL_LOGIN_BTN: Optional[str] = None
+
+    def __init__(self, page: Page, config: Optional[dict] = None, on_otp_required: Optional[Callable[[], str]] = None):
         self.page = page
+        self.config = config or {}
+        self.on_otp_required = on_otp_required
 
     @abstractmethod
-    def login(self, credentials: dict) -> bool:
+    async def login(self, credentials: dict) -> bool:
         """
         Perform login sequence.
         
@@ -21,7 +35,7 @@ class LLMProvider(ABC):
         pass
 
     @abstractmethod
-    def send_prompt(self, prompt: str) -> str:
+    async def send_prompt(self, prompt: str) -> str:
         """
         Send a prompt and get the response.
         
@@ -34,6 +48,6 @@ class LLMProvider(ABC):
         pass
     
     @abstractmethod
-    def handle_dialogs(self):
+    async def handle_dialogs(self):
         """Check for and dismiss known dialogs."""
         pass
@@ -1,19 +1,27 @@
-import time
+import inspect
 import os
 import logging
 from typing import Optional, Callable
-from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+from . import register
 from .base import LLMProvider
+from ..browser import wait_for_first
 from ..exceptions import AuthenticationError, SelectorError, PromptError, OTPRequiredError
 
 logger = logging.getLogger(__name__)
 
+@register("chatgpt")
 class ChatGPTProvider(LLMProvider):
     """ChatGPT implementation."""
 
     URL = "https://chatgpt.com/?temporary-chat=true"  # Changed to root URL
     # LOGIN_URL is no longer used directly, we navigate to URL then click login
 
+    # Clipboard access for response extraction
+    PERMISSIONS = ["clipboard-read", "clipboard-write"]
+    # Large sessions are split into "<name>.0", "<name>.1", ... so this is matched as a prefix
+    SESSION_COOKIE = "__Secure-next-auth.session-token"
+
     # Default Selectors
     DEFAULT_SELECTORS = {
         # New Login Flow Selectors
@@ -43,9 +51,7 @@ class ChatGPTProvider(LLMProvider):
     }
 
     def __init__(self, page: Page, config: Optional[dict] = None, on_otp_required: Optional[Callable[[], str]] = None):
-        super().__init__(page)
-        self.config = config or {}
-        self.on_otp_required = on_otp_required
+        super().__init__(page, config=config, on_otp_required=on_otp_required)
         self.selectors = self.DEFAULT_SELECTORS.copy()
         
         # Override selectors from config
@@ -54,23 +60,24 @@ class ChatGPTProvider(LLMProvider):
             
         # Map selectors to instance variables for easy access
         self.SEL_PROFILE_BTN = self.selectors["profile_btn"]
+        self.SEL_LOGIN_BTN = self.selectors["landing_login_btn"]
         self.SEL_TEXTAREA = self.selectors["textarea"]
         self.SEL_SEND_BTN = self.selectors["send_btn"]
         self.SEL_STOP_BTN = self.selectors["stop_btn"]
 
-    def login(self, credentials: dict) -> bool:
+    async def login(self, credentials: dict) -> bool:
         logger.info("Starting login process...")
         
         try:
             # 1. Go to main page
-            self.page.goto(self.URL)
+            await self.page.goto(self.URL)
             
             # 2. Handle Upsells/Dialogs immediately upon landing (as requested)
-            self.handle_dialogs()
+            await self.handle_dialogs()
             
             # 3. Check if already logged in (Profile button exists)
             try:
-                self.page.wait_for_selector(self.selectors["profile_btn"], timeout=3000)
+                await self.page.wait_for_selector(self.selectors["profile_btn"], timeout=3000)
                 logger.info("Already logged in.")
                 return True
             except:
@@ -79,7 +86,7 @@ class ChatGPTProvider(LLMProvider):
             # 4. Click the Landing Page "Log in" button
             try:
                 logger.info("Clicking 'Log in' from landing page...")
-                self.page.click(self.selectors["landing_login_btn"])
+                await self.page.click(self.selectors["landing_login_btn"])
             except Exception as e:
                 raise SelectorError(f"Could not find Login button on landing page: {e}")
 
@@ -93,63 +100,64 @@ class ChatGPTProvider(LLMProvider):
             if method == "google":
                 logger.info("Logging in via Google...")
                 # Wait for the modal/redirect to load the Google button
-                self.page.wait_for_selector(self.selectors["login_google_btn"])
-                self.page.click(self.selectors["login_google_btn"])
+                await self.page.wait_for_selector(self.selectors["login_google_btn"])
+                await self.page.click(self.selectors["login_google_btn"])
                 
                 # Google Email
                 logger.info("Entering Google email...")
-                self.page.wait_for_selector('input[type="email"]')
-                self.page.fill('input[type="email"]', email)
-                self.page.click('button:has-text("Next")') # Generic "Next" button
+                await self.page.wait_for_selector('input[type="email"]')
+                await self.page.fill('input[type="email"]', email)
+                await self.page.click('button:has-text("Next")') # Generic "Next" button
                 
                 # Google Password
                 logger.info("Entering Google password...")
-                self.page.wait_for_selector('input[type="password"]', state="visible")
-                self.page.fill('input[type="password"]', password)
-                self.page.click('button:has-text("Next")')
+                await self.page.wait_for_selector('input[type="password"]', state="visible")
+                await self.page.fill('input[type="password"]', password)
+                await self.page.click('button:has-text("Next")')
                 
             else:
                 # Email Step
                 logger.info("Entering email...")
-                self.page.wait_for_selector(self.selectors["email_input"])
-                self.page.fill(self.selectors["email_input"], email)
+                await self.page.wait_for_selector(self.selectors["email_input"])
+                await self.page.fill(self.selectors["email_input"], email)
                 
                 # Click Continue (using type="submit" to differentiate from Google button)
-                self.page.click(self.selectors["email_continue_btn"])
+                await self.page.click(self.selectors["email_continue_btn"])
                 
                 # Password Step
                 logger.info("Entering password...")
                 # Wait for password field to appear (animation)
-                self.page.wait_for_selector(self.selectors["password_input"])
-                self.page.fill(self.selectors["password_input"], password)
-                self.page.click(self.selectors["password_continue_btn"])
+                await self.page.wait_for_selector(self.selectors["password_input"])
+                await self.page.fill(self.selectors["password_input"], password)
+                await self.page.click(self.selectors["password_continue_btn"])
             
             # Wait for login to complete OR OTP check
             logger.info("Waiting for authentication or OTP...")
             
-            # Loop to check for success or OTP
-            for _ in range(30): # 30 seconds max
-                if self.page.is_visible(self.selectors["profile_btn"]):
-                    logger.info("Login successful.")
-                    return True
-                
-                if self.page.is_visible(self.selectors["otp_input"]):
-                    logger.warning("OTP verification required.")
-                    
-                    if not self.on_otp_required:
-                        raise OTPRequiredError("OTP required but no on_otp_required callback provided.")
-                    
-                    otp_code = self.on_otp_required()
-                    
-                    self.page.fill(self.selectors["otp_input"], otp_code)
-                    self.page.click(self.selectors["otp_validate"])
-                    logger.info("OTP submitted. Waiting for authentication...")
-                    self.page.wait_for_selector(self.selectors["profile_btn"], timeout=30000)
-                    logger.info("Login successful.")
-                    return True
-                
-                time.sleep(1)
-            
+            # Resolve as soon as either the profile button or the OTP input shows up (30 seconds max)
+            outcome = await wait_for_first(self.page, [self.selectors["profile_btn"], self.selectors["otp_input"]], timeout=30000)
+
+            if outcome == 0:
+                logger.info("Login successful.")
+                return True
+
+            if outcome == 1:
+                logger.warning("OTP verification required.")
+
+                if not self.on_otp_required:
+                    raise OTPRequiredError("OTP required but no on_otp_required callback provided.")
+
+                otp_code = self.on_otp_required()
+                if inspect.isawaitable(otp_code):
+                    otp_code = await otp_code
+
+                await self.page.fill(self.selectors["otp_input"], otp_code)
+                await self.page.click(self.selectors["otp_validate"])
+                logger.info("OTP submitted. Waiting for authentication...")
+                await self.page.wait_for_selector(self.selectors["profile_btn"], timeout=30000)
+                logger.info("Login successful.")
+                return True
+
             raise TimeoutError("Login timed out.")
                 
         except Exception as e:
@@ -157,7 +165,7 @@ class ChatGPTProvider(LLMProvider):
             screenshot_path = "/app/output/login_failure.png" if os.path.exists("/app/output") else "login_failure.png"
             logger.error(f"Login failed: {e}")
             logger.info(f"Taking screenshot: {screenshot_path}")
-            self.page.screenshot(path=screenshot_path)
+            await self.page.screenshot(path=screenshot_path)
             logger.info(f"Screenshot saved to: {screenshot_path}")
             
             # Re-raise as AuthenticationError if not already
@@ -166,51 +174,47 @@ class ChatGPTProvider(LLMProvider):
             else:
                 raise AuthenticationError(f"Login failed: {e}")
 
-    def handle_dialogs(self):
+    async def handle_dialogs(self):
         """Dismiss known dialogs."""
         # Try Go Upsell Modal - Wait for it and dismiss it!
         try:
             logger.debug("Checking for 'Try Go' upsell modal...")
             # Wait up to 5 seconds for the modal to appear
-            self.page.wait_for_selector('[data-testid="modal-no-auth-free-trial-upsell"]', timeout=5000, state="visible")
+            await self.page.wait_for_selector('[data-testid="modal-no-auth-free-trial-upsell"]', timeout=5000, state="visible")
             logger.info("Upsell modal detected, dismissing...")
             
             # Click "Maybe later" button
-            self.page.click(self.selectors["upsell_maybe_later"])
+            await self.page.click(self.selectors["upsell_maybe_later"])
             
             # Wait for modal to close
-            self.page.wait_for_selector('[data-testid="modal-no-auth-free-trial-upsell"]', timeout=5000, state="hidden")
+            await self.page.wait_for_selector('[data-testid="modal-no-auth-free-trial-upsell"]', timeout=5000, state="hidden")
             logger.debug("Upsell modal dismissed successfully")
-            self.page.wait_for_timeout(500)
+            await self.page.wait_for_timeout(500)
         except Exception as e:
             logger.debug(f"No upsell modal found or already dismissed: {e}")
             pass
             
         # Temporary Chat
         try:
-            if self.page.is_visible('h2:has-text("Temporary Chat")'):
+            if await self.page.is_visible('h2:has-text("Temporary Chat")'):
                 logger.debug("Dismissing 'Temporary Chat' dialog...")
-                self.page.click(self.selectors["temp_chat_continue"])
-                self.page.wait_for_timeout(500)
+                await self.page.click(self.selectors["temp_chat_continue"])
+                await self.page.wait_for_timeout(500)
         except:
             pass
 
-    def send_prompt(self, prompt: str) -> str:
+    async def send_prompt(self, prompt: str) -> str:
         # 1. Handle Dialogs first
-        self.handle_dialogs()
+        await self.handle_dialogs()
         
         # 2. Enter Prompt
         try:
-            self.page.wait_for_selector(self.selectors["textarea"])
-            self.page.fill(self.selectors["textarea"], prompt)
+            await self.page.wait_for_selector(self.selectors["textarea"])
+            await self.page.fill(self.selectors["textarea"], prompt)
             
             # 3. Click Send
-            self.page.wait_for_selector(self.selectors["send_btn"])
-            # Ensure it's enabled
-            if self.page.is_disabled(self.selectors["send_btn"]):
-                self.page.wait_for_timeout(500)
-            
-            self.page.click(self.selectors["send_btn"])
+            # click() waits for the button to be visible and enabled, no fixed delay needed
+            await self.page.click(self.selectors["send_btn"])
             
         except Exception as e:
             raise PromptError(f"Failed to send prompt: {e}")
@@ -219,32 +223,30 @@ class ChatGPTProvider(LLMProvider):
         logger.info("Waiting for response...")
         try:
             # Wait for Stop button to appear (generation started)
-            self.page.wait_for_selector(self.selectors["stop_btn"], timeout=5000)
+            await self.page.wait_for_selector(self.selectors["stop_btn"], timeout=5000)
             # Wait for Stop button to disappear (generation finished)
-            self.page.wait_for_selector(self.selectors["stop_btn"], state="hidden", timeout=120000) # 2 min timeout
+            await self.page.wait_for_selector(self.selectors["stop_btn"], state="hidden", timeout=120000) # 2 min timeout
         except PlaywrightTimeoutError:
-            if self.page.is_visible(self.selectors["send_btn"]):
+            if await self.page.is_visible(self.selectors["send_btn"]):
                 pass # It's done
             else:
                 raise PromptError("Timeout waiting for response generation.")
 
         # 5. Extract Response
         try:
-            # Wait for the assistant message to be present
-            self.page.wait_for_selector(self.selectors["assistant_msg"], timeout=5000)
-            
-            assistant_msgs = self.page.query_selector_all(self.selectors["assistant_msg"])
-            if not assistant_msgs:
+            # Wait for the latest assistant message to be present
+            last_msg = self.page.locator(self.selectors["assistant_msg"]).last
+            try:
+                await last_msg.wait_for(timeout=5000)
+            except PlaywrightTimeoutError:
                 raise SelectorError("No assistant messages found.")
             
-            last_msg = assistant_msgs[-1]
-            
             # Extract text from the markdown container
-            markdown_div = last_msg.query_selector('.markdown')
-            if markdown_div:
-                return markdown_div.inner_text()
+            markdown_div = last_msg.locator('.markdown')
+            if await markdown_div.count():
+                return await markdown_div.first.inner_text()
             else:
-                return last_msg.inner_text()
+                return await last_msg.inner_text()
             
         except Exception as e:
             raise PromptError(f"Failed to extract response: {e}")
\ No newline at end of file